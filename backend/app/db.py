@@ -1,11 +1,34 @@
 import os
+from functools import lru_cache
 
 from flask import g
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING, DESCENDING
 from werkzeug.local import LocalProxy
 import redis
 
 
+@lru_cache(maxsize=None)
+def get_mongo_client(uri):
+	"""
+	Returns the MongoClient for a URI, shared by all requests (it is thread-safe and pools its connections)
+	"""
+	return MongoClient(uri)
+
+
+@lru_cache(maxsize=None)
+def get_redis_client(host, port, password):
+	"""
+	Returns the Redis client for a server, shared by all requests (it is thread-safe and pools its connections)
+	"""
+	return redis.Redis(
+		host=host,
+		port=port,
+		password=password,
+		charset="utf-8",
+		decode_responses=True
+	)
+
+
 def get_db():
 	"""
 	Configuration method to return db instance
@@ -13,7 +36,7 @@ def get_db():
 	db = getattr(g, "_database", None)
 
 	if db is None:
-		client = MongoClient(os.environ["cdl_uri"])
+		client = get_mongo_client(os.environ["cdl_uri"])
 		db = g._database = client[os.environ["db_name"]]
 
 	return db
@@ -23,17 +46,22 @@ def get_redis():
 	rds = getattr(g, "_redis", None)
 
 	if rds is None:
-		rds = redis.Redis(
-			host=os.environ["redis_host"],
-			port=int(os.environ["redis_port"]),
-			password=os.environ["redis_password"],
-			charset="utf-8",
-			decode_responses=True
-		)
+		rds = get_redis_client(os.environ["redis_host"], int(os.environ["redis_port"]), os.environ["redis_password"])
 		g.__setattr__("_redis", rds)
 
 	return rds
 
 
+def create_indexes():
+	"""
+	Creates the MongoDB indexes used by frequent queries (no-op if they already exist)
+	"""
+	cdl_db = get_db()
+	# latest submissions of a user
+	cdl_db.logs.create_index([("user_id", ASCENDING), ("time", DESCENDING)])
+	# latest extension opens of a user
+	cdl_db.searches_clicks.create_index([("user_id", ASCENDING), ("type", ASCENDING), ("time", DESCENDING)])
+
+
 # Use LocalProxy to read the global db instance with just `db`
 db = LocalProxy(get_db)
@@ -1,10 +1,11 @@
 import json
 import os
 import re
+import threading
 import time
 from functools import wraps
 from urllib.parse import urlparse, urldefrag, quote
-from collections import defaultdict
+from collections import defaultdict, Counter
 
 import jwt
 import bleach
@@ -17,6 +18,14 @@ from app.models.users import Users
 
 import validators
 
+# terms considered for keyword queries (at least 3 letters/digits)
+KEYWORD_PATTERN = re.compile(r"\w{3,}")
+
+# bleach Cleaner used by sanitize_input. Building one is costly (html5lib parser setup), so it is built once,
+# but a Cleaner is not thread-safe, so it is used behind a lock (cleaning is CPU-bound under the GIL anyway)
+_sanitizer = bleach.sanitizer.Cleaner(tags=['mark'])
+_sanitizer_lock = threading.Lock()
+
 
 def validate_submission(highlighted_text, explanation, source_url=None):
     """
@@ -135,7 +144,7 @@ def build_display_url(url):
 	path = parsed_url.path
 	if path and path[-1] == "/":
 		path = path[:-1]
-	display_url = parsed_url.netloc + re.sub("/", " > ", path)
+	display_url = parsed_url.netloc + path.replace("/", " > ")
 	return display_url
 
 
@@ -277,16 +286,10 @@ def hydrate_with_hash_url(results, search_id, page=0, page_size=10, method="sear
 def hydrate_with_hashtags(results):
     for result in results:
         # add the hashtags
-        result["hashtags"] = []
-        hashtags_explanation = [x for x in result["explanation"].split() if len(x) > 1 and x[0] == "#"]
-        hashtags_ht = [x for x in result["highlighted_text"].split() if len(x) > 1 and x[0] == "#"]
-        hashtags = list(set(hashtags_explanation + hashtags_ht))
-        # remove mark in case hashtag is in body
+        hashtags = set(extract_hashtags(result["explanation"]) + extract_hashtags(result["highlighted_text"]))
 
-        hashtags = [re.sub("<mark>", "", x) for x in hashtags]
-        hashtags = [re.sub("</mark>", "", x) for x in hashtags]
-
-        result["hashtags"] = hashtags
+        # remove mark in case hashtag is in body
+        result["hashtags"] = [x.replace("<mark>", "").replace("</mark>", "") for x in hashtags]
     return results
 
 def diversify(pages, topn=10):
@@ -297,14 +300,32 @@ def diversify(pages, topn=10):
 
 def standardize_url(url):
     # remove fragment from query
-    if "#" in url:
-        url = url.split("#")[0]
-    return url
+    return url.split("#", 1)[0]
 
 def extract_hashtags(text):
       hashtags = [x for x in text.split() if len(x) > 1 and x[0] == "#"]
       return hashtags
 
+def extract_keywords(text, stopwords, k=8):
+    """
+    Picks the k most frequent non-stopword terms of a text, a fast alternative to noun phrase extraction for building queries.
+    Arguments:
+        text : (str) : the text to pick from.
+        stopwords : (dict or set) : lowercased terms to ignore.
+        k : (int) : the max number of terms.
+    Returns:
+        The picked terms joined with spaces, most frequent first.
+    """
+    counts = Counter(x for x in KEYWORD_PATTERN.findall(text.lower()) if x not in stopwords)
+    return " ".join(term for term, _ in counts.most_common(k))
+
+def has_core_hashtag(submission):
+    """
+    Checks if the explanation or highlighted text of a submission contains #core.
+    The highlighted text is only scanned if the explanation does not have it.
+    """
+    return "#core" in extract_hashtags(submission.explanation) or "#core" in extract_hashtags(submission.highlighted_text)
+
 
 def deduplicate(pages):
     """
@@ -330,8 +351,8 @@ def combine_pages(submissions_pages, webpages_index_pages):
 
     # Using the orig_url_to_idx_map to see if there is an in entry in webpages_index_pages to update score
     for webpage in webpages_index_pages:
-        if subpgs_url_to_id.get(webpage["orig_url"]):
-            i = subpgs_url_to_id.get(webpage["orig_url"])
+        i = subpgs_url_to_id.get(webpage["orig_url"])
+        if i is not None:
             submissions_pages[i]["score"] = submissions_pages[i]["score"] + webpage["score"]
     
     return submissions_pages + webpages_index_pages
@@ -345,9 +366,8 @@ def sanitize_input(input_data):
 	"""
 	if input_data and type(input_data)==str:
 		try:
-			# Define a list of allowed HTML tags and attributes
-			allowed_tags = ['mark']
-			sanitized_data = bleach.clean(input_data, tags=allowed_tags)
+			with _sanitizer_lock:
+				sanitized_data = _sanitizer.clean(input_data)
 			return sanitized_data
 
 		except Exception as e :
@@ -298,7 +298,8 @@ class ScrapeWorker:
             return False
         return len(anchor) >= 5
 
-    def format_url_to_path(self, url) -> str:
+    @staticmethod
+    def format_url_to_path(url) -> str:
         # for webarchive, get actual url
         if "://web.archive.org/web/" in url:
             url = url.split("://web.archive.org/web/")[1]
@@ -7,6 +7,11 @@ from app.models.redis_wrapper import Redis
 
 class Cache(Redis):
 	NUMBER_OF_HITS = "number_of_hits"
+	IS_COMPLETE = "is_complete"
+	PAGE_SIZE = 10
+	MISSING_SUBMISSION = "missing_submission"
+	CURSOR = "cursor"
+	EXPLORE_RECOMMENDATIONS = "explore_recommendations"
 
 	def __init__(self, time_to_live=60*60):
 		self.rds = get_redis()
@@ -19,8 +24,8 @@ class Cache(Redis):
 
 	def search(self, user_id, search_id, page):
 		key = self.get_key(user_id, search_id)
-		# Subtract one to not count 'NUMBER_OF_HITS' page.
-		pages_cached = len(self.hash_keys(key)) - 1
+		# Not counting the 'NUMBER_OF_HITS' and 'IS_COMPLETE' fields.
+		pages_cached = len([x for x in self.hash_keys(key) if x not in (self.NUMBER_OF_HITS, self.IS_COMPLETE)])
 		# If the number of cached pages is less than the requested page number then return.
 		if pages_cached <= page:
 			return 0, []
@@ -29,16 +34,19 @@ class Cache(Redis):
 		number_of_hits = self.hash_get(key, self.NUMBER_OF_HITS)
 		return number_of_hits, json.loads(jsn) if jsn else []
 
-	def insert(self, user_id, search_id, pages, index):
+	def insert(self, user_id, search_id, pages, index, number_of_hits=None, is_complete=True):
 		key = self.get_key(user_id, search_id)
 
 		# Storing number of hits in the cache to be used in frontend.
+		# Defaults to the number of results, unless they are only the first part of all hits.
+		# is_complete is false if pages are only the first part of all hits (so later pages need a new search).
 		mappings = {
-			self.NUMBER_OF_HITS: len(pages)
+			self.NUMBER_OF_HITS: len(pages) if number_of_hits is None else number_of_hits,
+			self.IS_COMPLETE: int(is_complete)
 		}
 		# Converting the list of results into pages and storing into the cache.
 		batch = []
-		page_size = 10
+		page_size = self.PAGE_SIZE
 		for i, page in enumerate(pages):
 			batch.append(page)
 			if len(batch) == page_size:
@@ -48,3 +56,66 @@ class Cache(Redis):
 			mappings[len(pages) // page_size] = json.dumps(batch)
 		self.hash_set(key, mappings)
 		return json.loads(mappings.get(index)) if mappings.get(index) else []
+
+	def is_complete(self, user_id, search_id):
+		"""
+		Checks if the cached pages of a search hold all of its hits.
+		"""
+		return self.hash_get(self.get_key(user_id, search_id), self.IS_COMPLETE) == "1"
+
+	def get_number_of_hits(self, user_id, search_id):
+		"""
+		Returns the cached number of hits of a search, or 0 if not cached.
+		"""
+		number_of_hits = self.hash_get(self.get_key(user_id, search_id), self.NUMBER_OF_HITS)
+		return int(number_of_hits) if number_of_hits else 0
+
+	def is_missing_submission(self, submission_id):
+		"""
+		Checks if a submission id was recently looked up and not found (negative cache).
+		"""
+		return self.get(self.get_key(self.MISSING_SUBMISSION, submission_id)) is not None
+
+	def insert_missing_submission(self, submission_id):
+		"""
+		Remembers that a submission id was not found, for time_to_live seconds.
+		"""
+		self.set(self.get_key(self.MISSING_SUBMISSION, submission_id), 1)
+
+	def get_cursor(self, user_id, search_id, page):
+		"""
+		Returns the number of hits and the Elastic sort values of the last hit on a page (for search_after), or None, None if not cached.
+		"""
+		key = self.get_key(self.CURSOR, self.get_key(user_id, search_id))
+		jsn = self.hash_get(key, page)
+		if not jsn:
+			return None, None
+		number_of_hits = self.hash_get(key, self.NUMBER_OF_HITS)
+		return int(number_of_hits) if number_of_hits else None, json.loads(jsn)
+
+	def insert_cursor(self, user_id, search_id, page, sort_values, number_of_hits=None):
+		"""
+		Stores the Elastic sort values of the last hit on a page, so the next page can be fetched with search_after.
+		The number of hits can be stored with it, so that later pages do not need to be counted again.
+		"""
+		mappings = {page: json.dumps(sort_values)}
+		if number_of_hits is not None:
+			mappings[self.NUMBER_OF_HITS] = number_of_hits
+		self.hash_set(self.get_key(self.CURSOR, self.get_key(user_id, search_id)), mappings)
+
+	def get_explore_recommendations(self, user_id, inputs_key):
+		"""
+		Returns the number of hits and the ranked pages of explore recommendations built from the same inputs, or None if not cached.
+		"""
+		jsn = self.get(self.get_key(self.EXPLORE_RECOMMENDATIONS, self.get_key(user_id, inputs_key)))
+		if not jsn:
+			return None
+		cached = json.loads(jsn)
+		return cached["number_of_hits"], cached["pages"]
+
+	def insert_explore_recommendations(self, user_id, inputs_key, number_of_hits, pages):
+		"""
+		Stores the number of hits and the ranked pages of explore recommendations, keyed by their inputs (e.g., the latest submission ids).
+		"""
+		self.set(self.get_key(self.EXPLORE_RECOMMENDATIONS, self.get_key(user_id, inputs_key)),
+		         json.dumps({"number_of_hits": number_of_hits, "pages": pages}))
@@ -1,6 +1,8 @@
 #     community_id
 # 	  parsed url (no fragment): {hashtag: [submission_ids]}}
 
+from pymongo import InsertOne, UpdateOne, DeleteOne
+
 from app.db import get_db
 from app.models.mongo import Mongo
 
@@ -38,47 +40,14 @@ class CommunityCores(Mongo):
 
 
 		if not community_core:
-			community_core = {"community_id": community_id, "core_content": {url: {hashtag: [submission_id] for hashtag in hashtags}}}
+			community_core = self.apply_update(None, community_id, url, hashtags, submission_id)
 			community_core_id = self.collection.insert_one(community_core)
 			return community_core_id
 		
 		# otherwise, update the existing entry
 		else:
 			community_core_id = community_core["_id"]
-			if url not in community_core["core_content"]:
-				community_core["core_content"][url] = {}
-
-			"""
-			get dict of all existing hashtags
-			for each submitted hashtag:
-				if in existing hashtags:
-					add submission_id
-				if not in existing hashtags:
-					create submission list, and add submission
-				delete hashtag from all existing hashtags
-			for all existing hashtags:
-				remove submission id from that list, if it is there
-
-			"""
-			existing_hashtags = {hashtag: True for hashtag in community_core["core_content"][url]}
-			for hashtag in hashtags:
-				if hashtag not in community_core["core_content"][url]:
-					community_core["core_content"][url][hashtag] = [submission_id]
-				else:
-					del existing_hashtags[hashtag]
-					if submission_id not in community_core["core_content"][url][hashtag]:
-						community_core["core_content"][url][hashtag].append(submission_id)
-			for hashtag in existing_hashtags:
-				if submission_id in community_core["core_content"][url][hashtag]:
-					community_core["core_content"][url][hashtag] = [x for x in community_core["core_content"][url][hashtag] if x != submission_id]
-
-					if community_core["core_content"][url][hashtag] == []:
-						del community_core["core_content"][url][hashtag]
-
-			# check if empty url
-			if community_core["core_content"][url] == {}:
-				del community_core["core_content"][url]
-
+			community_core = self.apply_update(community_core, community_id, url, hashtags, submission_id)
 
 			# check if empty community
 			if community_core["core_content"] == {}:
@@ -90,7 +59,92 @@ class CommunityCores(Mongo):
 				update_id = self.collection.update_one({"_id": community_core_id}, {"$set": {"core_content": community_core["core_content"]}})
 				return update_id
 
-			
+	def bulk_update(self, updates):
+		"""
+		Applies several community core content link updates with one read and one write.
+
+		Parameters:
+
+			updates : list : a list of (community_id, url, hashtags, submission_id) tuples, same as the arguments of update.
+				They are applied in order, so multiple updates to the same community are fine.
+
+		Returns:
+
+			The pymongo BulkWriteResult, or None if there was nothing to write.
+		"""
+		if not updates:
+			return None
+
+		community_ids = list({community_id for community_id, _, _, _ in updates})
+		community_cores = {community_core["community_id"]: community_core
+						   for community_core in self.collection.find({"community_id": {"$in": community_ids}})}
+
+		for community_id, url, hashtags, submission_id in updates:
+			community_cores[community_id] = self.apply_update(community_cores.get(community_id), community_id, url,
+															  hashtags, submission_id)
+
+		ops = []
+		for community_core in community_cores.values():
+			if "_id" not in community_core:
+				# newly created entry
+				if community_core["core_content"] != {}:
+					ops.append(InsertOne(community_core))
+			elif community_core["core_content"] == {}:
+				ops.append(DeleteOne({"_id": community_core["_id"]}))
+			else:
+				ops.append(UpdateOne({"_id": community_core["_id"]}, {"$set": {"core_content": community_core["core_content"]}}))
+
+		if not ops:
+			return None
+		return self.collection.bulk_write(ops, ordered=False)
+
+	def apply_update(self, community_core, community_id, url, hashtags, submission_id):
+		"""
+		Updates a raw community core document in memory (no database calls), see update for the parameters.
+		If community_core is None, a new document (without an _id) is created.
+
+		Returns:
+
+			The updated community core document.
+		"""
+		if not community_core:
+			return {"community_id": community_id, "core_content": {url: {hashtag: [submission_id] for hashtag in hashtags}}}
+
+		if url not in community_core["core_content"]:
+			community_core["core_content"][url] = {}
+
+		"""
+		get dict of all existing hashtags
+		for each submitted hashtag:
+			if in existing hashtags:
+				add submission_id
+			if not in existing hashtags:
+				create submission list, and add submission
+			delete hashtag from all existing hashtags
+		for all existing hashtags:
+			remove submission id from that list, if it is there
+
+		"""
+		existing_hashtags = {hashtag: True for hashtag in community_core["core_content"][url]}
+		for hashtag in hashtags:
+			if hashtag not in community_core["core_content"][url]:
+				community_core["core_content"][url][hashtag] = [submission_id]
+			else:
+				del existing_hashtags[hashtag]
+				if submission_id not in community_core["core_content"][url][hashtag]:
+					community_core["core_content"][url][hashtag].append(submission_id)
+		for hashtag in existing_hashtags:
+			if submission_id in community_core["core_content"][url][hashtag]:
+				community_core["core_content"][url][hashtag] = [x for x in community_core["core_content"][url][hashtag] if x != submission_id]
+
+				if community_core["core_content"][url][hashtag] == []:
+					del community_core["core_content"][url][hashtag]
+
+		# check if empty url
+		if community_core["core_content"][url] == {}:
+			del community_core["core_content"][url]
+
+		return community_core
 
 			
 
@@ -11,7 +11,7 @@ class Logs(Mongo):
 
 	def convert(self, log_db):
 		return Log(
-			log_db["ip"],
+			log_db.get("ip"),
 			log_db["user_id"],
 			log_db["highlighted_text"],
 			log_db["source_url"],
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
 
+from pymongo import ReturnDocument
+
 
 class Mongo(ABC):
 	collection = None
@@ -8,8 +10,10 @@ class Mongo(ABC):
 	def convert(self, document):
 		pass
 
-	def find(self, query):
-		return [self.convert(document) for document in self.collection.find(query)]
+	def find(self, query, sort=None, limit=0, projection=None):
+		# sort is a list of (key, direction) pairs, limit of 0 means no limit
+		# projection limits the returned fields, convert has to handle the missing ones
+		return [self.convert(document) for document in self.collection.find(query, projection, sort=sort, limit=limit)]
 
 	def find_one(self, query):
 		document = self.collection.find_one(query)
@@ -18,6 +22,11 @@ class Mongo(ABC):
 	def update_one(self, query, user, upsert=True):
 		return self.collection.update_one(query, user, upsert=upsert)
 
+	def find_one_and_update(self, query, update, return_document=ReturnDocument.BEFORE):
+		# returns the document as it was before the update by default
+		document = self.collection.find_one_and_update(query, update, return_document=return_document)
+		return self.convert(document) if document else None
+
 	def exists(self, query):
 		return self.collection.find(query).limit(1).count(with_limit_and_skip=True) >= 1
 
@@ -38,3 +47,7 @@ class Mongo(ABC):
 	# Searching all directly to MongoDB without Model
 	def find_db(self, query):
 		return self.collection.find(query)
+
+	# Aggregating directly in MongoDB without Model
+	def aggregate(self, pipeline):
+		return list(self.collection.aggregate(pipeline))
@@ -22,7 +22,8 @@ class SearchesClicks(Mongo):
 				click_db["query"],
 				click_db["community"],
 				click_db["time"],
-				own_submissions=click_db.get("own_submissions", False)
+				own_submissions=click_db.get("own_submissions", False),
+				community_names=click_db.get("community_names", None)
 			)
 		elif click_db["type"] == "extension_open":
 
@@ -39,11 +40,13 @@ class SearchesClicks(Mongo):
 					click_db["query"],
 					id=click_db["_id"],
 					time=click_db["time"],
-					community=click_db.get("community", None)
+					community=click_db.get("community", None),
+					community_names=click_db.get("community_names", None)
 				)
 
 class SearchClickExtension:
-	def __init__(self, ip, user_id, url, highlighted_text, type, query, id=None, time=None, community=None, own_submissions=False):
+	def __init__(self, ip, user_id, url, highlighted_text, type, query, id=None, time=None, community=None, own_submissions=False,
+				 community_names=None):
 		self.id = id
 		self.ip = ip
 		self.user_id = user_id
@@ -53,6 +56,7 @@ class SearchClickExtension:
 		self.type = type
 		self.own_submissions = own_submissions
 		self.community = community
+		self.community_names = community_names
 		self.time = time.time() if not time else time
 
 	def insert(self):
@@ -74,7 +78,7 @@ class SearchClickExtension:
 # TODO: Fix ID issue on creation
 class SearchClickWebpageSearch:
 
-	def __init__(self, id, ip, user_id, typ, query, community, time, own_submissions=False):
+	def __init__(self, id, ip, user_id, typ, query, community, time, own_submissions=False, community_names=None):
 		self.id = id
 		self.ip = ip
 		self.user_id = user_id
@@ -83,6 +87,7 @@ class SearchClickWebpageSearch:
 		self.community = community
 		self.time = time.time() if not time else time
 		self.own_submissions = own_submissions
+		self.community_names = community_names
 
 	def insert(self):
 		click_db = {
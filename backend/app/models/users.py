@@ -1,4 +1,6 @@
 import time
+from functools import cached_property
+
 from app.db import get_db
 from app.models.mongo import Mongo
 
@@ -42,3 +44,10 @@ class User:
 		self.hashed_password = hashed_password
 		self.communities = communities
 		self.created = created
+
+	@cached_property
+	def communities_set(self):
+		"""
+		The user's community ids as a frozenset, for O(1) membership checks. Computed once per user object.
+		"""
+		return frozenset(self.communities)
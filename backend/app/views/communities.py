@@ -36,7 +36,7 @@ def get_community_history(current_user):
 
 		left_communities = {}
 		for log in all_community_logs:
-			if log.community_id not in current_user.communities:
+			if log.community_id not in current_user.communities_set:
 				community = cdl_communities.find_one({"_id": log.community_id})
 
 				if community:
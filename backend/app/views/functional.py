@@ -1,19 +1,26 @@
 import json
 import os
-import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from heapq import nlargest
+from itertools import chain
 
 from bson import ObjectId
-from flask import Blueprint, request, redirect
+from flask import Blueprint, request, redirect, current_app, g
 from flask_cors import CORS
 from textblob import TextBlob
+from werkzeug.local import LocalProxy
 import traceback
 import time
 import random
 import requests
 
+from app.db import get_db, get_redis
 from app.helpers.helpers import token_required, build_display_url, build_result_hash, build_redirect_url, \
     format_time_for_display, validate_submission, hydrate_with_hash_url, create_page, hydrate_with_hashtags, \
-    deduplicate, combine_pages, standardize_url, extract_hashtags, sanitize_input
+    deduplicate, combine_pages, standardize_url, extract_hashtags, has_core_hashtag, sanitize_input, \
+    extract_keywords
 from app.helpers import response
 from app.helpers.status import Status
 from app.helpers.scraper import ScrapeWorker
@@ -34,23 +41,66 @@ from elastic.manage_data import ElasticManager
 functional = Blueprint('functional', __name__)
 CORS(functional)
 
-# Connect to elastic for submissions index operations
-elastic_manager = ElasticManager(
-    os.environ["elastic_username"],
-    os.environ["elastic_password"],
-    os.environ["elastic_domain"],
-    os.environ["elastic_index_name"],
-    None,
-    "submissions")
-
-# Connect to elastic for webpages index operations
-webpages_elastic_manager = ElasticManager(
-    os.environ["elastic_username"],
-    os.environ["elastic_password"],
-    os.environ["elastic_domain"],
-    os.environ["elastic_webpages_index_name"],
-    None,
-    "webpages")
+# max number of submissions from a single batch request processed at once (bounded to not overload Mongo/Elastic)
+BATCH_SUBMISSION_WORKERS = 8
+
+# max number of submitted webpages scraped at once in the background
+SCRAPE_WORKERS = 4
+scrape_executor = ThreadPoolExecutor(max_workers=SCRAPE_WORKERS)
+# URLs queued or being scraped, so that close submissions of a URL do not scrape (and insert) it twice
+pending_scrapes = set()
+pending_scrapes_lock = threading.Lock()
+
+# number of hits fetched from each index for a search (more with neural reranking, which needs candidates)
+SEARCH_WINDOW_SIZE = 50
+RERANK_SEARCH_WINDOW_SIZE = 100
+# the most hits fetched from each index, however deep the requested page
+MAX_SEARCH_WINDOW_SIZE = 1000
+# fields of a submission used by format_submission_for_display (the IP is not sent to Python)
+SUBMISSION_DISPLAY_FIELDS = {"user_id": 1, "highlighted_text": 1, "source_url": 1, "explanation": 1, "communities": 1,
+                             "time": 1, "deleted": 1}
+# number of hits fetched from each index for explore recommendations, and the number of top results kept
+RECOMMENDATION_WINDOW_SIZE = 50
+# terms to pick explore recommendation queries from when the user has no activity yet
+DEFAULT_EXPLORE_TERMS = tuple(("transformer natural language processing illinois machine learning startup neural network hack "
+                               "hacker technology future explanation application building coding search engine computer vision "
+                               "recurrent classification generation chatgpt gpt3 data").split())
+# seconds that explore recommendations are reused for while the user's latest activity is unchanged
+EXPLORE_RECOMMENDATIONS_TTL = 5 * 60
+# seconds that a submission id found in neither submissions nor webpages is remembered as missing
+MISSING_SUBMISSION_TTL = 60
+
+@lru_cache(maxsize=1)
+def get_elastic_manager():
+    """
+	Connects to elastic for submissions index operations, on first use instead of at import.
+	"""
+    return ElasticManager(
+        os.environ["elastic_username"],
+        os.environ["elastic_password"],
+        os.environ["elastic_domain"],
+        os.environ["elastic_index_name"],
+        None,
+        "submissions")
+
+
+@lru_cache(maxsize=1)
+def get_webpages_elastic_manager():
+    """
+	Connects to elastic for webpages index operations, on first use instead of at import.
+	"""
+    return ElasticManager(
+        os.environ["elastic_username"],
+        os.environ["elastic_password"],
+        os.environ["elastic_domain"],
+        os.environ["elastic_webpages_index_name"],
+        None,
+        "webpages")
+
+
+# Use LocalProxy so that the managers can be used like module-level instances
+elastic_manager = LocalProxy(get_elastic_manager)
+webpages_elastic_manager = LocalProxy(get_webpages_elastic_manager)
 
 
 @functional.route("/api/connect/", methods=["POST"])
@@ -71,11 +121,10 @@ def create_connection(current_user):
     try:
         ip = request.remote_addr
         user_id = current_user.id
-        # Changed request.form.get to request.get_json
-        connection_source = request.get_json()['connection_source']
-        # Changed request.form.get to request.get_json
-        connection_target = request.get_json()['connection_target']
-        connection_description = request.form.get("connection_description", "")
+        request_json = request.get_json(silent=True) or {}
+        connection_source = request_json['connection_source']
+        connection_target = request_json['connection_target']
+        connection_description = request_json.get("connection_description", "")
         try:
             connection_source_id = ObjectId(connection_source)
             connection_target_id = ObjectId(connection_target)
@@ -117,7 +166,7 @@ def create_submission(current_user):
     try:
         ip = request.remote_addr
         user_id = current_user.id
-        user_communities = current_user.communities
+        user_communities = current_user.communities_set
         highlighted_text = sanitize_input(request.form.get("highlighted_text", ""))
         source_url = request.form.get("source_url")
         explanation = request.form.get("explanation")
@@ -156,46 +205,118 @@ def create_batch_submission(current_user):
 				explanation/title : (string) : the reason provided by the user for why the webpage is helpful.
 
 	Returns:
-		In all cases, a status code and a list containing the status/error message (if any) for each attempted submission.
+		In all cases, a status code and a "results" list containing the status/error message (if any) for each attempted submission,
+		in the same order as data. On failure, "errors" also lists the indices of the submissions that failed.
 		This is so that errors can be assessed individually and so you can re-send the submissions that failed.
 	"""
     r = request.get_json()
     data = r['data']
     community = r['community']
-    results = {}
+
+    # the request context is not available in the worker threads, so read everything needed from it here
+    ip = request.remote_addr
+    user_id = current_user.id
+    user_communities = current_user.communities_set
+    app = current_app._get_current_object()
+    cdl_db = get_db()
+    rds = get_redis()
+
+    # all submissions go to the same community, so only check it once
+    try:
+        community_message, community_status = check_submission_community(user_id, user_communities, community)
+    except Exception as e:
+        print(e)
+        traceback.print_exc()
+        community_message = "Failed to create submission, please try again later."
+        community_status = Status.INTERNAL_SERVER_ERROR
+    if community_status != Status.OK:
+        results = [{'message': community_message, 'status': community_status} for _ in data]
+        return response.error_payload({"results": results, "errors": list(range(len(data)))}, Status.INTERNAL_SERVER_ERROR)
+
+    def submit_one(i, submission):
+        """
+		Validates, logs and builds the documents of one submission. Anything shared by the batch (the index, the community core,
+		the scraped webpages) is only returned, and written once for the batch after all submissions are done.
+		"""
+        # the submission's document to index and its community core links, if any
+        index_queue = []
+        core_updates = []
+        with app.app_context():
+            # reuse this request's (thread-safe) connections instead of opening new ones per worker
+            g._database = cdl_db
+            g._redis = rds
+            try:
+                highlighted_text = sanitize_input(submission["highlighted_text"])
+                source_url = submission["source_url"]
+                explanation = submission["explanation"]
+
+                message, status, submission_id = create_submission_helper(ip=ip, user_id=user_id, user_communities=user_communities, highlighted_text=highlighted_text,
+                                    source_url=source_url, explanation=explanation, community=community,
+                                    check_community=False, index_queue=index_queue, core_updates=core_updates, scrape=False)
+
+                if status == Status.OK:
+                    return i, {
+                        "message": message,
+                        "submission_id": str(submission_id),
+                        "status": status
+                    }, False, index_queue, core_updates
+                else:
+                    return i, {'message': message, 'status': status }, True, index_queue, core_updates
+
+            except Exception as e:
+                print(e)
+                traceback.print_exc()
+                error_message = "Failed to create submission, please try again later."
+                error_status = Status.INTERNAL_SERVER_ERROR
+                return i, {'message': error_message, 'status': error_status }, True, index_queue, core_updates
+
+    results = [None] * len(data)
     errors = []
-    for i, submission in enumerate(data):
-        try:
-            ip = request.remote_addr
-            user_id = current_user.id
-            user_communities = current_user.communities
-            highlighted_text = sanitize_input(submission["highlighted_text"])
-            source_url = submission["source_url"]
-            explanation = submission["explanation"]
-
-            message, status, submission_id = create_submission_helper(ip=ip, user_id=user_id, user_communities=user_communities, highlighted_text=highlighted_text,
-                                source_url=source_url, explanation=explanation, community=community)
-            
-            if status == Status.OK:
-                results[f'Submission {i}'] = {
-                    "message": message,
-                    "submission_id": str(submission_id),
-                    "status": status
-                }
-            else:
-                results[f'Submission {i}'] = {'message': message, 'status': status }
+    # logged submissions (with their position in data), indexed together afterwards
+    index_queue = []
+    # community core links, written together afterwards (concurrent read-modify-writes of the same core would lose links)
+    core_updates = []
+    # the webpages to scrape, once per normalized URL (see get_scrape_key)
+    scrape_urls = {}
+    # submissions are I/O bound (Mongo), so run them concurrently
+    with ThreadPoolExecutor(max_workers=BATCH_SUBMISSION_WORKERS) as executor:
+        for i, result, is_error, item_index_queue, item_core_updates in executor.map(submit_one, range(len(data)), data):
+            results[i] = result
+            if is_error:
                 errors.append(i)
+            else:
+                scrape_urls.setdefault(get_scrape_key(data[i]["source_url"]), data[i]["source_url"])
+            index_queue += [(i, doc) for doc in item_index_queue]
+            core_updates += item_core_updates
+    if index_queue:
+        try:
+            indexed = elastic_manager.bulk_add_to_index([doc for _, doc in index_queue])
+        except Exception as e:
+            print(e)
+            traceback.print_exc()
+            indexed = [False] * len(index_queue)
+        print("SUBMISSION_BULK_INDEX_STATUS", indexed)
 
+        # the submissions are logged, but fail the ones that could not be indexed (as when indexing them one by one)
+        for (i, _), is_indexed in zip(index_queue, indexed):
+            if not is_indexed:
+                results[i] = {'message': "Failed to create submission, please try again later.", 'status': Status.INTERNAL_SERVER_ERROR}
+                errors.append(i)
+        errors.sort()
+    if core_updates:
+        try:
+            CommunityCores().bulk_update(core_updates)
         except Exception as e:
             print(e)
-            error_message = "Failed to create submission, please try again later."
-            error_status = Status.INTERNAL_SERVER_ERROR
-            results[f'Submission {i}'] = {'message': error_message, 'status': error_status }
-            errors.append(i)
+            traceback.print_exc()
+            print("Failed to update Community Core Content")
+    for source_url in scrape_urls.values():
+        # scraping can take seconds, so it is done after responding
+        schedule_scrape(app, source_url)
     if len(errors) == 0:
-        return response.success(results, Status.OK)
+        return response.success({"results": results}, Status.OK)
     else:
-        return response.error(results, Status.INTERNAL_SERVER_ERROR)
+        return response.error_payload({"results": results, "errors": errors}, Status.INTERNAL_SERVER_ERROR)
 
 @functional.route("/api/redirect", methods=["GET"])
 def click():
@@ -242,11 +363,11 @@ def feedback(current_user):
 	"""
     try:
         ip = request.remote_addr
+        request_json = request.get_json(silent=True) or {}
 
-        user_feedback = UserFeedback(ip, current_user.id, request.get_json()["message"])
+        user_feedback = UserFeedback(ip, current_user.id, request_json["message"])
         try:
-            # Changed request.form.get to request.get_json
-            submission_id = request.get_json()["submission_id"]
+            submission_id = request_json.get("submission_id", "")
             if submission_id != "":
                 submission_id = ObjectId(submission_id)
                 user_feedback.submission_id = submission_id
@@ -308,29 +429,30 @@ def submission(current_user, id):
         cdl_logs = Logs()
         cdl_webpages = Webpages()
 
+        try:
+            submission_id = ObjectId(id)
+        except Exception as e:
+            print(e)
+            return response.error("Invalid submission ID", Status.NOT_FOUND)
 
         if request.method == "DELETE":
-            if request.data:
-                request_data = json.loads(request.data.decode("utf-8"))
-                community_id = request_data.get("community_id", None)
-            else:
-                community_id = None
+            # body is optional and may be sent without a JSON content type
+            community_id = request.get_json(force=True).get("community_id") if request.data else None
             # deleting the entire submission
             if not community_id:
                 # the user_id should guarantee that a submission can only be deleted by the user who submitted it.
-                update = cdl_logs.update_one({"user_id": ObjectId(user_id), "_id": ObjectId(id)},
-                                             {"$set": {"deleted": True}}, upsert=False)
-                if update.acknowledged:
+                old_record = cdl_logs.find_one_and_update({"user_id": user_id, "_id": submission_id},
+                                                          {"$set": {"deleted": True}})
+                if old_record:
                     index_update = elastic_manager.delete_document(id)
 
                     # if delete successful, remove it from community core if necessary
-                    old_record = cdl_logs.find_one({"_id": ObjectId(id)})
-                    if "#core" in list(set(extract_hashtags(old_record.explanation) + extract_hashtags(old_record.highlighted_text))):
+                    if has_core_hashtag(old_record):
                         community_core = CommunityCores()
                         hashtags = []
                         standardized_url = standardize_url(old_record.source_url)
                         for community in old_record.communities[str(user_id)]:
-                            community_core.update(community, standardized_url, hashtags, ObjectId(id))
+                            community_core.update(community, standardized_url, hashtags, submission_id)
                             
 
 
@@ -344,29 +466,34 @@ def submission(current_user, id):
             else:
                 community_id = ObjectId(community_id)
                 # removing from a community (NOT THREAD SAFE)
-                current_submission = cdl_logs.find_one({"_id": ObjectId(id)})
+                current_submission = cdl_logs.find_one({"_id": submission_id})
+                if not current_submission:
+                    return response.error("Submission not found.", Status.NOT_FOUND)
                 submission_communities = current_submission.communities
                 user_id = str(user_id)
 
-                if user_id in submission_communities:
-                    submission_communities[user_id] = [x for x in submission_communities[user_id] if x != community_id]
-                if submission_communities[user_id] == []:
+                # nothing to do (or write) if the user did not add the submission to this community
+                user_added_communities = submission_communities.get(user_id, [])
+                if community_id not in user_added_communities:
+                    return response.error("Unable to remove from community.", Status.NOT_FOUND)
+                user_added_communities.remove(community_id)
+                if not user_added_communities:
                     del submission_communities[user_id]
-                update = cdl_logs.update_one({"_id": ObjectId(id)}, {"$set": {"communities": submission_communities}})
+                update = cdl_logs.update_one({"_id": submission_id}, {"$set": {"communities": submission_communities}})
                 if update.acknowledged:
                     current_submission.communities = submission_communities
-                    deleted_index_status = elastic_manager.delete_document(id)
+                    # re-indexing under the same id replaces the whole document, no need to delete it first
                     added_index_status, _ = elastic_manager.add_to_index(current_submission)
                     log_community_action(ip, user_id, community_id, "DELETE", submission_id=current_submission.id)
 
 
                     # if delete successful, remove it from community core if necessary
                     # removal from community, so hashtags set to empty
-                    if "#core" in list(set(extract_hashtags(current_submission.explanation) + extract_hashtags(current_submission.highlighted_text))):
+                    if has_core_hashtag(current_submission):
                         community_core = CommunityCores()
                         hashtags = []
                         standardized_url = standardize_url(current_submission.source_url)
-                        community_core.update(community_id, standardized_url, hashtags, ObjectId(id))
+                        community_core.update(community_id, standardized_url, hashtags, submission_id)
 
 
 
@@ -392,13 +519,8 @@ def submission(current_user, id):
                                       Status.BAD_REQUEST)
             
 
-            try:
-                submission = cdl_logs.find_one({"_id": ObjectId(id)})
-            except Exception as e:
-                print(e)
-                traceback.print_exc()
-                return response.error("Invalid submission ID", Status.NOT_FOUND)
-            
+            submission = cdl_logs.find_one({"_id": submission_id})
+
             if not submission:
                 return response.error("Submission not found.", Status.NOT_FOUND)
 
@@ -414,8 +536,7 @@ def submission(current_user, id):
                 submission_communities = submission.communities
 
                 # need to check that user is a member of the community
-                user_communities = current_user.communities
-                if community_id not in user_communities:
+                if community_id not in current_user.communities_set:
                     return response.error("Must include a community_id.", Status.FORBIDDEN)
 
                 # block web community
@@ -444,20 +565,22 @@ def submission(current_user, id):
                     insert_obj["source_url"] = source_url
 
 
-            update = cdl_logs.update_one({"_id": ObjectId(id)}, {"$set": insert_obj})
+            update = cdl_logs.update_one({"_id": submission_id}, {"$set": insert_obj})
 
             if update.acknowledged:
 
-
+                # hashtags of the submission before the edit, each text is only scanned once
+                old_hashtags_ht = set(extract_hashtags(submission.highlighted_text))
+                old_hashtags_explanation = set(extract_hashtags(submission.explanation))
 
                 # a submission is added to a new community
                 if community_id:
-                    hashtags = list(set(extract_hashtags(submission.highlighted_text) + extract_hashtags(submission.explanation)))
+                    hashtags = old_hashtags_ht | old_hashtags_explanation
                     if "#core" in hashtags:
                         community_core = CommunityCores()
-                        hashtags = [x for x in hashtags if x != "#core"]
+                        hashtags.discard("#core")
                         standardized_url = standardize_url(submission.source_url)
-                        community_core.update(ObjectId(community_id), standardized_url, hashtags, ObjectId(id))
+                        community_core.update(community_id, standardized_url, list(hashtags), submission_id)
 
                 # the url/text of a submission is changed
                     # the submission has the exact same hashtags
@@ -467,59 +590,56 @@ def submission(current_user, id):
                         # others changed
 
                 old_source_url = submission.source_url
-                
-                hashtags = []
+
                 OLD_CORE_FLAG = False
 
-                if "highlighted_text" in insert_obj: 
-                    hashtags += extract_hashtags(highlighted_text)
-                    old_hashtags = extract_hashtags(submission.highlighted_text)
+                if "highlighted_text" in insert_obj:
                     submission.highlighted_text = highlighted_text
-                    if "#core" in old_hashtags:
+                    if "#core" in old_hashtags_ht:
                         OLD_CORE_FLAG = True
-                else:
-                    hashtags += extract_hashtags(submission.highlighted_text)
 
                 if "explanation" in insert_obj:
-                    hashtags += extract_hashtags(explanation)
-                    old_hashtags = extract_hashtags(submission.explanation)
                     submission.explanation = explanation
-                    if "#core" in old_hashtags:
+                    if "#core" in old_hashtags_explanation:
                         OLD_CORE_FLAG = True
-                else:
-                     hashtags += extract_hashtags(submission.explanation)
-
 
                 if "source_url" in insert_obj:
                     submission.source_url = source_url
 
-                deleted_index_status = elastic_manager.delete_document(id)
+                # re-indexing under the same id replaces the whole document, no need to delete it first
+                # (also needed when only the communities changed)
+                # the new hashtags (of both fields) are extracted when indexing
                 added_index_status, hashtags = elastic_manager.add_to_index(submission)
 
 
                 # update community core content if necessary
+                # not needed if only the communities changed: adding to a community is handled above
 
                 UPDATE_FLAG = False
-                if OLD_CORE_FLAG and "#core" not in hashtags:
-                    hashtags = []
-                    UPDATE_FLAG = True
-                if "#core" in hashtags:
-                    hashtags = [x for x in hashtags if x != "#core"]
-                    UPDATE_FLAG = True
+                if "highlighted_text" in insert_obj or "explanation" in insert_obj or "source_url" in insert_obj:
+                    hashtags = set(hashtags)
+                    if OLD_CORE_FLAG and "#core" not in hashtags:
+                        hashtags = set()
+                        UPDATE_FLAG = True
+                    if "#core" in hashtags:
+                        hashtags.discard("#core")
+                        UPDATE_FLAG = True
 
                 if UPDATE_FLAG:
                     community_core = CommunityCores()
-                    all_communities = [x for user_id in submission.communities for x in submission.communities[user_id]]
+                    all_communities = list(chain.from_iterable(submission.communities.values()))
 
                     standardized_new_url = standardize_url(submission.source_url)
                     standardized_old_url = standardize_url(old_source_url)
 
-                    # need to update across all communities
-                    for community_id in all_communities:
+                    # need to update across all communities, written in a single bulk operation
+                    core_updates = []
+                    for core_community_id in all_communities:
                         if standardized_new_url != standardized_old_url:
-                            community_core.update(community_id, standardized_old_url, [], ObjectId(id))
-                        community_core.update(community_id, standardized_new_url, hashtags, ObjectId(id))
-                
+                            core_updates.append((core_community_id, standardized_old_url, [], submission_id))
+                        core_updates.append((core_community_id, standardized_new_url, list(hashtags), submission_id))
+                    community_core.bulk_update(core_updates)
+
 
                 if "communities" in insert_obj:
                     log_community_action(ip, user_id, community_id, "ADD", submission_id=submission.id)
@@ -529,12 +649,18 @@ def submission(current_user, id):
 
         elif request.method == "GET":
             communities = current_user.communities
+
+            # short negative cache, so that repeated requests for a missing id do not query both collections
             try:
-                submission = cdl_logs.find_one({"_id": ObjectId(id)})
+                missing_cache = Cache(time_to_live=MISSING_SUBMISSION_TTL)
+                if missing_cache.is_missing_submission(id):
+                    return response.error("Cannot find submission.", Status.NOT_FOUND)
             except Exception as e:
                 print(e)
                 traceback.print_exc()
-                return response.error("Invalid submission ID", Status.NOT_FOUND)
+                missing_cache = None
+
+            submission = cdl_logs.find_one({"_id": submission_id})
 
             try:
                 is_deleted = submission.deleted
@@ -542,30 +668,37 @@ def submission(current_user, id):
                 is_deleted = False
 
             if submission and not is_deleted:
-                community_submissions = {str(cid) for uid in submission.communities for cid in
-                                         submission.communities[uid]}
-                for community in communities:
-                    if str(community) in community_submissions:
-                        search_id = log_submission_view(ip, user_id, submission.id).inserted_id
-                        submission = format_submission_for_display(submission, current_user, search_id)
-                        submission["connections"] = find_connections(ObjectId(id), communities, current_user, search_id)
-                        return response.success({"submission": submission}, Status.OK)
+                community_submissions = {str(cid) for cid in chain.from_iterable(submission.communities.values())}
+                is_shared_with_user = not {str(c) for c in communities}.isdisjoint(community_submissions)
 
-                # Case where user is the original submitter but it has been removed from all communities.
-                if str(submission.user_id) == str(user_id):
+                # Second case is where user is the original submitter but it has been removed from all communities.
+                if is_shared_with_user or str(submission.user_id) == str(user_id):
                     search_id = log_submission_view(ip, user_id, submission.id).inserted_id
-                    submission = format_submission_for_display(submission, current_user, search_id)
-                    submission["connections"] = find_connections(ObjectId(id), communities, current_user, search_id)
+                    accessible_connections = get_accessible_connections(submission_id, communities)
+
+                    # the submission and its connections share one stats lookup and one community lookup
+                    all_stats = get_submissions_stats([submission.id] + [target_connection.id for _, target_connection
+                                                                         in accessible_connections])
+                    user_communities_info = get_communities_helper(current_user, return_dict=True)["community_info"]
+
+                    connections = find_connections(accessible_connections, current_user, search_id, all_stats,
+                                                   user_communities_info)
+                    submission = format_submission_for_display(submission, current_user, search_id,
+                                                               stats=all_stats[submission.id],
+                                                               user_communities_info=user_communities_info)
+                    submission["connections"] = connections
                     return response.success({"submission": submission}, Status.OK)
 
                 return response.error("You do not have access to this submission.", Status.FORBIDDEN)
             elif not submission:
                 try:
-                    webpage = cdl_webpages.find_one({"_id": ObjectId(id)})
+                    webpage = cdl_webpages.find_one({"_id": submission_id})
                     if webpage:
                         search_id = log_submission_view(ip, user_id, webpage.id).inserted_id
                         submission = format_webpage_for_display(webpage, search_id)
                         return response.success({"submission": submission}, Status.OK)
+                    elif missing_cache:
+                        missing_cache.insert_missing_submission(id)
                 except Exception as e:
                     print(e)
                     traceback.print_exc()
@@ -637,17 +770,17 @@ def search(current_user):
                 URL_CORE_RETRIEVE = url
 
             # remove any hashtags
-            highlighted_text_nohash = re.sub("#", " ", highlighted_text)
+            highlighted_text_nohash = highlighted_text.replace("#", " ")
 
             if not highlighted_text:
                 query = url
             elif len(highlighted_text.split()) < 10:
                 query = highlighted_text_nohash
+            elif "noun_phrase_queries" in os.environ:
+                # slower, but higher quality phrases
+                query = noun_phrase_query(highlighted_text_nohash)
             else:
-                # here
-                blob = TextBlob(highlighted_text_nohash)
-                new_terms = " ".join(list(set([x for x in blob.noun_phrases])))
-                query = new_terms
+                query = extract_keywords(highlighted_text_nohash, elastic_manager.stopwords)
 
         requested_communities = request.args.get("community")
 
@@ -660,9 +793,10 @@ def search(current_user):
         page = max(0, int(page))
 
         search_id = request.args.get("search_id", None)
+        is_paging = bool(search_id)
 
         # if the search_id is not included, then user is requesting a new search
-        if not search_id:
+        if not is_paging:
             if requested_communities == "all":
                 # search over all communities of the user
                 requested_communities = user_communities
@@ -674,14 +808,18 @@ def search(current_user):
                 except:
                     # need to return community_info for search bar option render
                     return response.error("Community ID is invalid.", Status.INTERNAL_SERVER_ERROR)
-                if requested_communities[0] not in user_communities:
+                if requested_communities[0] not in current_user.communities_set:
                     return response.error("You do not have access to this community.", Status.FORBIDDEN)
             # convert communities to str for elastic
             requested_communities = [str(x) for x in requested_communities]
 
+            # make requested communities a dict containing the name too, for display (logged for paging)
+            rc_dict = get_community_names(get_communities_helper(current_user, return_dict=True)["community_info"],
+                                          requested_communities)
+
             # Create a new search_id (as it is the first search by the user)
             search_id, _ = log_search(ip, user_id, source, query, requested_communities, own_submissions, url=url,
-                                      highlighted_text=highlighted_text)
+                                      highlighted_text=highlighted_text, community_names=rc_dict)
             search_id = str(search_id)  # for return
 
             # also scrape the webpage if there is a url
@@ -723,18 +861,20 @@ def search(current_user):
                 query = prior_search.query
                 own_submissions = prior_search.own_submissions
                 requested_communities = [str(x) for x in prior_search.community]
+                rc_dict = prior_search.community_names
+                if rc_dict is not None:
+                    # only the ones the user is still a member of
+                    rc_dict = {community_id: name for community_id, name in rc_dict.items()
+                               if ObjectId(community_id) in current_user.communities_set}
             else:
                 return response.error("Cannot find search to page.", Status.NOT_FOUND)
 
-        # make requested communities a dict containing the name too, for display
-        communities = get_communities_helper(current_user, return_dict=True)["community_info"]
-        rc_dict = {}
-        for community_id in requested_communities:
-            try:
-                rc_dict[community_id] = communities[community_id]["name"]
-            except Exception as e:
-                print(e)
-                print(f"Could not find community for community id: {community_id}")
+            # searches logged without their community names
+            if rc_dict is None:
+                rc_dict = get_community_names(get_communities_helper(current_user, return_dict=True)["community_info"],
+                                              requested_communities)
+
+        user_id_str = str(user_id)
 
         # issue: in the case where we get subsequent pages in a search (1+), we cannot tell whether a single community has been requested
         # or the user only has a single community
@@ -746,11 +886,9 @@ def search(current_user):
         return_obj["search_id"] = search_id
         return_obj["current_page"] = page
 
-        user_id_str = str(user_id)
-
         total_num_results, search_results_page = cache_search(query, search_id, page, rc_dict, user_id=user_id_str,
                                                               own_submissions=own_submissions, toggle_webpage_results=toggle_webpage_results,
-                                                              url_core_retrieve=URL_CORE_RETRIEVE)
+                                                              url_core_retrieve=URL_CORE_RETRIEVE, is_fresh=not is_paging)
 
         return_obj["total_num_results"] = total_num_results
         return_obj["search_results_page"] = search_results_page
@@ -822,18 +960,13 @@ def get_recommendations(current_user, toggle_webpage_results = True):
 
         user_id_str = str(user_id)
 
-        communities = get_communities_helper(current_user, return_dict=True)["community_info"]
-        rc_dict = {}
-        for community_id in requested_communities:
-            try:
-                rc_dict[community_id] = communities[community_id]["name"]
-            except Exception as e:
-                print(e)
-                print(f"Could not find community for community id: {community_id}")
-
         # if the recommendation_id is not included, then this is first page/fresh request
         if not recommendation_id:
 
+            # community names are only needed to build the pages, which are cached for paging
+            communities = get_communities_helper(current_user, return_dict=True)["community_info"]
+            rc_dict = get_community_names(communities, requested_communities)
+
             # Create a new recommendation_id (first request by the user)
             recommendation_id, _ = log_recommendation_request(ip, user_id, requested_communities, method)
 
@@ -844,8 +977,6 @@ def get_recommendations(current_user, toggle_webpage_results = True):
                 pages = create_page(hits, rc_dict, toggle_display="preview")
                 # no score for recommendation?
                 # pages = deduplicate(pages)
-                pages = hydrate_with_hash_url(pages, recommendation_id, method=method)
-                pages = hydrate_with_hashtags(pages)
                 page = cache.insert(user_id_str, recommendation_id, pages, page_number)
 
 
@@ -861,8 +992,7 @@ def get_recommendations(current_user, toggle_webpage_results = True):
                 # explore: user's submission data
                 try:
                     cdl_logs = Logs()
-                    user_latest_submissions = cdl_logs.find({"user_id": ObjectId(user_id_str)})
-                    user_latest_submissions = sorted(user_latest_submissions, reverse=True, key=lambda x: x.time)[:3]
+                    user_latest_submissions = cdl_logs.find({"user_id": ObjectId(user_id_str)}, sort=[("time", -1)], limit=3)
                     source_urls = {str(x.source_url) for x in user_latest_submissions} # potential change to urls
                 except Exception as e:
                     user_latest_submissions = []
@@ -871,8 +1001,8 @@ def get_recommendations(current_user, toggle_webpage_results = True):
                     traceback.print_exc()
 
                 for submission in user_latest_submissions:
-                    highlighted_text_nohash = re.sub("#", " ", submission.highlighted_text)
-                    title_text_nohash = re.sub("#", " ", submission.explanation)
+                    highlighted_text_nohash = submission.highlighted_text.replace("#", " ")
+                    title_text_nohash = submission.explanation.replace("#", " ")
 
                     full_text += " " + highlighted_text_nohash + " " + title_text_nohash
 
@@ -880,8 +1010,7 @@ def get_recommendations(current_user, toggle_webpage_results = True):
                 try:
                     cdl_searches_clicks = SearchesClicks()
                     users_extension_opens = cdl_searches_clicks.find(
-                        {"type": "extension_open", "user_id": ObjectId(user_id_str)})
-                    users_extension_opens = sorted(users_extension_opens, reverse=True, key=lambda x: x.time)[:3]
+                        {"type": "extension_open", "user_id": ObjectId(user_id_str)}, sort=[("time", -1)], limit=3)
 
                 except Exception as e:
                     users_extension_opens = []
@@ -890,42 +1019,61 @@ def get_recommendations(current_user, toggle_webpage_results = True):
 
                 for extension_open in users_extension_opens:
                     if extension_open and extension_open.highlighted_text:
-                        highlighted_text_nohash = re.sub("#", " ", extension_open.highlighted_text)
+                        highlighted_text_nohash = extension_open.highlighted_text.replace("#", " ")
                         full_text += " " + highlighted_text_nohash
 
-                if len(full_text) > 3:
-                    blob = TextBlob(full_text)
-                    new_terms = " ".join(list(set([x for x in blob.noun_phrases if len(x) > 3])))
-                    search_text += " " + new_terms
+                # refreshing the feed with the same latest submissions and extension opens reuses the recent result
+                try:
+                    recommendations_cache = Cache(time_to_live=EXPLORE_RECOMMENDATIONS_TTL)
+                    explore_key = "-".join(sorted(requested_communities) + [str(x.id) for x in user_latest_submissions] +
+                                           [str(x.id) for x in users_extension_opens])
+                    cached_recommendations = recommendations_cache.get_explore_recommendations(user_id_str, explore_key)
+                except Exception as e:
+                    print(e)
+                    traceback.print_exc()
+                    recommendations_cache = None
+                    cached_recommendations = None
 
-                # if empty, assign random
-                if search_text == "":
-                    search_text = "transformer natural language processing illinois machine learning startup neural network hack hacker technology future explanation application building coding search engine computer vision recurrent classification generation chatgpt gpt3 data"
+                if cached_recommendations:
+                    number_of_hits, pages = cached_recommendations
+                else:
+                    if len(full_text) > 3:
+                        if "noun_phrase_queries" in os.environ:
+                            # slower, but higher quality phrases
+                            new_terms = noun_phrase_query(full_text)
+                        else:
+                            # more terms than are searched (10), so the random pick below still varies the recommendations
+                            new_terms = extract_keywords(full_text, elastic_manager.stopwords, k=20)
+                        search_text += " " + new_terms
 
+                    # if empty, assign random
+                    if search_text == "":
+                        split_text = DEFAULT_EXPLORE_TERMS
+                    else:
+                        split_text = search_text.split()
 
-                # randomize the search text to 10 query terms
-                split_text = search_text.split()
-                if len(split_text) > 10:
-                    random.shuffle(split_text)
-                    search_text = " ".join(split_text[:10])
+                    # randomize the search text to 10 query terms
+                    search_text = " ".join(random.sample(split_text, 10) if len(split_text) > 10 else split_text)
 
                 
-                number_of_hits, submissions_hits = elastic_manager.search(search_text, list(communities.keys()), page=0,
-                                                              page_size=50)
-                submissions_pages = create_page(submissions_hits, rc_dict, toggle_display="preview")
-
-                if toggle_webpage_results:
-                    # Searching for recommendations from the webpages index
-                    _, webpages_hits = webpages_elastic_manager.search(search_text, [], page=0, page_size=50)
-                    webpages_index_pages = create_page(webpages_hits, rc_dict, toggle_display="preview")
-
-                    submissions_pages = combine_pages(submissions_pages, webpages_index_pages)
-
-                # Sorting pages based on score, high to low
-                pages = sorted(submissions_pages, reverse=True, key=lambda x: x["score"])
-                pages = deduplicate(pages)
-                pages = hydrate_with_hash_url(pages, recommendation_id, method=method)
-                pages = hydrate_with_hashtags(pages)
+                    (number_of_hits, submissions_hits), (_, webpages_hits) = search_submissions_and_webpages(
+                        search_text, list(communities.keys()), RECOMMENDATION_WINDOW_SIZE, toggle_webpage_results=toggle_webpage_results,
+                        preference=search_preference(user_id))
+                    submissions_pages = create_page(submissions_hits, rc_dict, toggle_display="preview")
+
+                    if toggle_webpage_results:
+                        # Recommendations from the webpages index
+                        webpages_index_pages = create_page(webpages_hits, rc_dict, toggle_display="preview")
+
+                        submissions_pages = combine_pages(submissions_pages, webpages_index_pages)
+
+                    # Top pages based on score, high to low
+                    pages = nlargest(RECOMMENDATION_WINDOW_SIZE, submissions_pages, key=lambda x: x["score"])
+                    pages = deduplicate(pages)
+
+                    if recommendations_cache:
+                        recommendations_cache.insert_explore_recommendations(user_id_str, explore_key, number_of_hits, pages)
+
                 page = cache.insert(user_id_str, recommendation_id, pages, page_number)
 
 
@@ -933,6 +1081,10 @@ def get_recommendations(current_user, toggle_webpage_results = True):
         else:
             number_of_hits, page = cache.search(user_id_str, recommendation_id, page_number)
 
+        # pages are cached without the hash URL and hashtags, only the returned page needs them
+        page = hydrate_with_hash_url(page, recommendation_id, page=page_number, page_size=Cache.PAGE_SIZE, method=method)
+        page = hydrate_with_hashtags(page)
+
         return_obj["recommendation_id"] = recommendation_id
         return_obj["current_page"] = page_number
         return_obj["total_num_results"] = number_of_hits
@@ -947,21 +1099,118 @@ def get_recommendations(current_user, toggle_webpage_results = True):
 
 ### HELPERS that cannot be removed (yet)###
 
-def create_submission_helper(ip=None, user_id=None, user_communities=None, highlighted_text=None, source_url=None, explanation=None, community=None):
-    # assumed string, so check to make sure is not none
-    if highlighted_text == None:
-        highlighted_text = ""
+@lru_cache(maxsize=2048)
+def noun_phrase_query(text):
+    """
+	Helper function for building a query out of the noun phrases of a long highlighted text.
+	Cached because noun phrase extraction (NLTK tagging) is slow and the same highlights are re-sent on reloads.
+	Arguments:
+		text : (string) : the highlighted text, hashtags removed.
+	Returns:
+		query : (string) : the space-joined unique noun phrases.
+	"""
+    blob = TextBlob(text)
+    return " ".join(set(blob.noun_phrases))
+
+
+def get_community_names(communities, community_ids):
+    """
+	Helper function for getting the names of the requested communities, for display.
+	Arguments:
+		communities : (dict) : the "community_info" of get_communities_helper with return_dict.
+		community_ids : (list) : the requested community IDs (str).
+	Returns:
+		community_names : (dict) : the name of each requested community, by ID (unknown IDs are left out).
+	"""
+    community_names = {}
+    for community_id in community_ids:
+        try:
+            community_names[community_id] = communities[community_id]["name"]
+        except Exception as e:
+            print(e)
+            print(f"Could not find community for community id: {community_id}")
+    return community_names
+
+
+def search_preference(user_id):
+    """
+	Helper function for the Elastic search preference, so that a user's searches hit the same shard copies.
+	Arguments:
+		user_id : (ObjectID or str) : the searching user, if any.
+	Returns:
+		preference : (string) : the user id, or the request IP for anonymous requests.
+	"""
+    if user_id:
+        return str(user_id)
+    return request.remote_addr
 
+
+def search_submissions_and_webpages(query, communities, page_size, toggle_webpage_results=True, preference=None):
+    """
+	Helper function for searching the submissions (and webpages) indices with a single Elastic round-trip.
+	Arguments:
+		query : (string) : the search query.
+		communities : (list) : the community IDs to condition the submissions search.
+		page_size : (int) : the number of hits to fetch from each index.
+		toggle_webpage_results : (boolean) : to also search the webpages index or not.
+		preference : (string) : the Elastic search preference, from search_preference.
+	Returns:
+		(submissions_total, submissions_hits), (webpages_total, webpages_hits) : webpages are (0, []) if not toggled.
+	"""
+    if not toggle_webpage_results:
+        return elastic_manager.search(query, communities, page=0, page_size=page_size, preference=preference), (0, [])
+
+    searches = [
+        (elastic_manager.index_name, elastic_manager.build_search_query(query, communities, page=0, page_size=page_size)),
+        (webpages_elastic_manager.index_name, webpages_elastic_manager.build_search_query(query, [], page=0, page_size=page_size))
+    ]
+    submissions_results, webpages_results = elastic_manager.multi_search(searches, preference=preference)
+    return submissions_results, webpages_results
+
+
+def check_submission_community(user_id, user_communities, community):
+    """
+	Helper function for checking that a user can submit to a community.
+	Arguments:
+		user_id : (ObjectID) : the ID of the submitting user.
+		user_communities : (frozenset) : the ids of the user's communities.
+		community : (string) : the ID of the community to submit to.
+	Returns:
+		message : (string) : the error message, if any.
+		status : (Status) : Status.OK if the user can submit to the community.
+	"""
     # hard-coded to prevent submissions to the web community
     if community == "63a4c21aee3be6ac5c533a55" and str(user_id) != "63a4c201ee3be6ac5c533a54":
-        return "You cannot submit to this community.", Status.FORBIDDEN, None
+        return "You cannot submit to this community.", Status.FORBIDDEN
 
     if community == "":
-        return "Error: A community must be selected.", Status.BAD_REQUEST, None
+        return "Error: A community must be selected.", Status.BAD_REQUEST
     if not Communities().find_one({"_id": ObjectId(community)}):
-        return "Error: Cannot find community.", Status.BAD_REQUEST, None
+        return "Error: Cannot find community.", Status.BAD_REQUEST
     if ObjectId(community) not in user_communities:
-        return "Error: You do not have access to this community.", Status.FORBIDDEN, None
+        return "Error: You do not have access to this community.", Status.FORBIDDEN
+
+    return "Community can be submitted to.", Status.OK
+
+
+def create_submission_helper(ip=None, user_id=None, user_communities=None, highlighted_text=None, source_url=None, explanation=None, community=None,
+                             check_community=True, index_queue=None, core_updates=None, scrape=True):
+    """
+	Helper function for validating, logging and indexing a submission (and scraping its webpage).
+	If index_queue (a list) is provided, the submission is appended to it instead of being indexed,
+	so that the caller can index all of them with one bulk request.
+	Likewise, if core_updates (a list) is provided, community core links are appended to it (for CommunityCores.bulk_update)
+	instead of being written, and with scrape=False the caller is left to scrape the webpage.
+	"""
+    # assumed string, so check to make sure is not none
+    if highlighted_text == None:
+        highlighted_text = ""
+
+    # can be skipped when already checked by the caller (e.g., once for a whole batch)
+    if check_community:
+        message, status = check_submission_community(user_id, user_communities, community)
+        if status != Status.OK:
+            return message, status, None
 
     # for some reason, in the case that there is no explanation or URL
     if not explanation or not source_url:
@@ -976,53 +1225,117 @@ def create_submission_helper(ip=None, user_id=None, user_communities=None, highl
 
     if status.acknowledged:
         doc.id = status.inserted_id
-        index_status, hashtags = elastic_manager.add_to_index(doc)
+        if index_queue is None:
+            index_status, hashtags = elastic_manager.add_to_index(doc)
+            print("SUBMISSION_INDEX_STATUS", index_status)
+        else:
+            _, _, hashtags = elastic_manager.build_index_document(doc)
+            index_queue.append(doc)
 
         # update community core content if necessary
         try:
             if "#core" in hashtags:
                 hashtags = [x for x in hashtags if x != "#core"]
                 standardized_url = standardize_url(source_url)
-                community_core = CommunityCores()
-                community_core.update(ObjectId(community), standardized_url, hashtags, ObjectId(doc.id))
+                if core_updates is None:
+                    community_core = CommunityCores()
+                    community_core.update(ObjectId(community), standardized_url, hashtags, ObjectId(doc.id))
+                else:
+                    core_updates.append((ObjectId(community), standardized_url, hashtags, ObjectId(doc.id)))
         except Exception as e:
             print(e)
             traceback.print_exc()
             print("Failed to update Community Core Content")
-        
-        print("SUBMISSION_INDEX_STATUS", index_status)
-        webpages = Webpages()
-        scraper = ScrapeWorker(webpages.collection)
-
-        if not scraper.is_scraped_before(source_url):
-            data = scraper.scrape(source_url)  # Triggering Scraper
-
-            # Check if the URL was already scraped
-            if data['scrape_status']['code'] != -1:
-                # Check if the scrape was not successful
-                if data["scrape_status"]["code"] != 1:
-                    data["webpage"] = {}
-
-                # insert in MongoDB
-                insert_status, webpage = log_webpage(data["url"],
-                                                        data["webpage"],
-                                                        data["scrape_status"],
-                                                        data["scrape_time"]
-                                                        )
-                if insert_status.acknowledged and data["scrape_status"]["code"] == 1:
-                    # index in OpenSearch
-                    index_status, _ = webpages_elastic_manager.add_to_index(webpage)
-                    print("WEBPAGE_INDEX_STATUS", index_status)
 
-                else:
-                    print("Unable to insert webpage data in database.")
+        if scrape:
+            # scraping can take seconds, so it is done after responding
+            schedule_scrape(current_app._get_current_object(), source_url)
 
         return "Context successfully submitted and indexed.", Status.OK, status.inserted_id
         
     else:
         return "Unable to make submission. Please try again later.", Status.INTERNAL_SERVER_ERROR, None
 
-def cache_search(query, search_id, index, communities, user_id, own_submissions=False, toggle_webpage_results=True, url_core_retrieve=None):
+def get_scrape_key(source_url):
+    """
+	Helper function for the key of a webpage to scrape, the normalized path that ScrapeWorker.is_scraped_before matches on
+	(e.g., without "www.", the query or the fragment), so that variants of a URL are only scraped once.
+	Arguments:
+		source_url : (string) : the URL of the submitted webpage.
+	Returns:
+		scrape_key : (string) : the normalized path, or the URL if it has none.
+	"""
+    url, path = ScrapeWorker.format_url_to_path(source_url)
+    return path or url
+
+
+def schedule_scrape(app, source_url):
+    """
+	Helper function for scraping the webpage of a submission in the background, unless it is already queued or being scraped.
+	The check of whether a webpage was scraped before and its insert are not atomic, so they must not run concurrently for a URL.
+	Arguments:
+		app : (Flask) : the app, see scrape_and_index_webpage.
+		source_url : (string) : the URL of the submitted webpage.
+	"""
+    scrape_key = get_scrape_key(source_url)
+    with pending_scrapes_lock:
+        if scrape_key in pending_scrapes:
+            return
+        pending_scrapes.add(scrape_key)
+    try:
+        scrape_executor.submit(scrape_and_index_webpage, app, source_url, scrape_key)
+    except Exception:
+        with pending_scrapes_lock:
+            pending_scrapes.discard(scrape_key)
+        raise
+
+
+def scrape_and_index_webpage(app, source_url, scrape_key):
+    """
+	Helper function for scraping, logging and indexing the webpage of a submission, run in the background by schedule_scrape.
+	Arguments:
+		app : (Flask) : the app, for an app context (the request's is gone by the time this runs).
+		source_url : (string) : the URL of the submitted webpage.
+		scrape_key : (string) : the key of the webpage in pending_scrapes, from get_scrape_key.
+	"""
+    with app.app_context():
+        try:
+            webpages = Webpages()
+            scraper = ScrapeWorker(webpages.collection)
+
+            if not scraper.is_scraped_before(source_url):
+                data = scraper.scrape(source_url)  # Triggering Scraper
+
+                # Check if the URL was already scraped
+                if data['scrape_status']['code'] != -1:
+                    # Check if the scrape was not successful
+                    if data["scrape_status"]["code"] != 1:
+                        data["webpage"] = {}
+
+                    # insert in MongoDB
+                    insert_status, webpage = log_webpage(data["url"],
+                                                            data["webpage"],
+                                                            data["scrape_status"],
+                                                            data["scrape_time"]
+                                                            )
+                    if insert_status.acknowledged and data["scrape_status"]["code"] == 1:
+                        # index in OpenSearch
+                        index_status, _ = webpages_elastic_manager.add_to_index(webpage)
+                        print("WEBPAGE_INDEX_STATUS", index_status)
+
+                    else:
+                        print("Unable to insert webpage data in database.")
+        except Exception as e:
+            print(e)
+            traceback.print_exc()
+            print(f"Failed to scrape webpage: {source_url}")
+        finally:
+            with pending_scrapes_lock:
+                pending_scrapes.discard(scrape_key)
+
+
+def cache_search(query, search_id, index, communities, user_id, own_submissions=False, toggle_webpage_results=True, url_core_retrieve=None,
+                 is_fresh=False):
     """
 	Helper function for pulling search results.
 	Arguments:
@@ -1034,6 +1347,7 @@ def cache_search(query, search_id, index, communities, user_id, own_submissions=
 		own_submissions: (boolean) : true if user is viewing their own submissions, false otherwise
         toggle_webpage_results: (boolean) : to include webpage results with submissions or not
         url_core_retrieve : (None or URL str) : to include core results in a search (when extension is opened)
+        is_fresh : (boolean) : true if the search_id was just created, so nothing can be cached for it yet
 	Returns:
 		return_obj : (list) : a list of formatted submissions for frontned display
 							Note that result_hash and redirect_url will be empty (need to hydrate)
@@ -1046,12 +1360,28 @@ def cache_search(query, search_id, index, communities, user_id, own_submissions=
 
     # Use elastic cache when we don't need to do any reranking or dedup
     if own_submissions or query == "":
+        try:
+            cache = Cache()
+            # continue from the last hit of the previous page (and reuse its count), if it was fetched
+            cached_number_of_hits, search_after = cache.get_cursor(user_id, search_id, index - 1) if index > 0 else (None, None)
+        except Exception as e:
+            print(e)
+            cache = None
+            cached_number_of_hits, search_after = None, None
+
+        total_hits = cached_number_of_hits is None
         if own_submissions:
             # for getting own submissions (currently can't search them)
-            number_of_hits, hits = elastic_manager.get_submissions(user_id, page=index)
+            number_of_hits, hits = elastic_manager.get_submissions(user_id, page=index, search_after=search_after, total_hits=total_hits)
         else:
             # assuming that there will be only one
-            number_of_hits, hits = elastic_manager.get_community(list(communities.keys())[0], page=index)
+            number_of_hits, hits = elastic_manager.get_community(list(communities.keys())[0], page=index, search_after=search_after,
+                                                                 total_hits=total_hits)
+        if not total_hits:
+            number_of_hits = cached_number_of_hits
+
+        if cache and hits and "sort" in hits[-1]:
+            cache.insert_cursor(user_id, search_id, index, hits[-1]["sort"], number_of_hits=number_of_hits)
 
         results = create_page(hits, communities)
         results = hydrate_with_hash_url(results, search_id, page=index)
@@ -1067,16 +1397,28 @@ def cache_search(query, search_id, index, communities, user_id, own_submissions=
             cache = None
         print("\tcache start time: ", time.time() - start_time)
 
-        if cache:
+        # true when the cached pages already hold every hit of the search
+        is_complete = False
+        if cache and not is_fresh:
             number_of_hits, page = cache.search(user_id, search_id, index)
+            if not page and cache.is_complete(user_id, search_id):
+                # past the last page, searching again would not find more
+                is_complete = True
+                number_of_hits = cache.get_number_of_hits(user_id, search_id)
             
         print("\tcache end time: ", time.time() - start_time)
 
 
         # If we cannot find cache page, (re)do the search
-        if not page:
+        if not page and not is_complete:
 
-            _, submissions_hits = elastic_manager.search(query, list(communities.keys()), page=0, page_size=1000)
+            # only fetch enough hits for the requested page (x2 since deduplication removes some)
+            window_size = RERANK_SEARCH_WINDOW_SIZE if "neural_api" in os.environ else SEARCH_WINDOW_SIZE
+            window_size = min(max(window_size, 2 * (index + 1) * Cache.PAGE_SIZE), MAX_SEARCH_WINDOW_SIZE)
+
+            (submissions_total, submissions_hits), (webpages_total, webpages_hits) = search_submissions_and_webpages(
+                query, list(communities.keys()), window_size, toggle_webpage_results=toggle_webpage_results,
+                preference=search_preference(user_id))
             
 
 
@@ -1089,7 +1431,8 @@ def cache_search(query, search_id, index, communities, user_id, own_submissions=
                         if url in community_core.core_content:
                             core_hashtags = list(community_core.core_content[url].keys())
                             core_hashtags = list(set(core_hashtags))
-                            _, core_hits = elastic_manager.search(" ".join(core_hashtags), [community_id], page=0, page_size=1000)
+                            _, core_hits = elastic_manager.search(" ".join(core_hashtags), [community_id], page=0, page_size=window_size,
+                                                                  preference=search_preference(user_id))
 
 
                             # to put on top
@@ -1107,10 +1450,7 @@ def cache_search(query, search_id, index, communities, user_id, own_submissions=
 
             if toggle_webpage_results:
 
-                # Searching exactly a user's community from the webpages index
-                _, webpages_hits = webpages_elastic_manager.search(query, [], page=0, page_size=1000)
-                print("\tWebpage search: ", time.time() - start_time)
-
+                # webpages hits were fetched with the submissions above
                 webpages_index_pages = create_page(webpages_hits, communities)
 
                 print("\tWebpage pages: ", time.time() - start_time)
@@ -1139,18 +1479,27 @@ def cache_search(query, search_id, index, communities, user_id, own_submissions=
                 print("\t Neural Rerank not available")
 
 
-            pages = sorted(submissions_pages, reverse=True, key=lambda x: x["score"])
+            # only the top window is kept, the combined hits of both indices are up to twice that
+            is_truncated = len(submissions_pages) > window_size
+            pages = nlargest(window_size, submissions_pages, key=lambda x: x["score"])
 
             pages = deduplicate(pages)
             print("\tDedup: ", time.time() - start_time)
-            pages = hydrate_with_hash_url(pages, search_id, page=index)
-            print("\tURL: ", time.time() - start_time)
-            pages = hydrate_with_hashtags(pages)
-            print("\tHash: ", time.time() - start_time)
             number_of_hits = len(pages)
-            page = cache.insert(user_id, search_id, pages, index)
+            # if not all hits were kept, there is more to page to (up to the max window), which is searched for on request
+            has_more = is_truncated or submissions_total > window_size or webpages_total > window_size
+            is_complete = not has_more or window_size >= MAX_SEARCH_WINDOW_SIZE
+            if not is_complete:
+                # the total is unknown after deduplication, so only offer the next page
+                number_of_hits += Cache.PAGE_SIZE
+            page = cache.insert(user_id, search_id, pages, index, number_of_hits=number_of_hits, is_complete=is_complete)
             print("\tCache: ", time.time() - start_time)
 
+        # pages are cached without the hash URL and hashtags, only the returned page needs them
+        page = hydrate_with_hash_url(page, search_id, page=index, page_size=Cache.PAGE_SIZE)
+        print("\tURL: ", time.time() - start_time)
+        page = hydrate_with_hashtags(page)
+        print("\tHash: ", time.time() - start_time)
 
     return number_of_hits, page
 
@@ -1162,21 +1511,12 @@ def format_webpage_for_display(webpage, search_id):
     submission["submission_id"] = webpage["_id"]
 
 
+    stats = get_submissions_stats([submission["submission_id"]])[submission["submission_id"]]
     submission["stats"] = {
-        "views": 0,
-        "clicks": 0,
+        "views": stats["views"],
+        "clicks": stats["clicks"],
         "shares": 0
     }
-    cdl_searches_clicks = SearchesClicks()
-    num__search_clicks = cdl_searches_clicks.count({"submission_id": submission["submission_id"], "type": "click_search_result"})
-    submission["stats"]["clicks"] = num__search_clicks
-
-    cdl_recommendations_clicks = RecommendationsClicks()
-    num_rec_clicks = cdl_recommendations_clicks.count({"submission_id": submission["submission_id"]})
-    submission["stats"]["clicks"] += num_rec_clicks
-
-    num_views = cdl_searches_clicks.count({"submission_id": submission["submission_id"], "type": "submission_view"})
-    submission["stats"]["views"] = num_views
 
     submission["communities"] = {}
     submission["communities_part_of"] = {}
@@ -1206,7 +1546,40 @@ def format_webpage_for_display(webpage, search_id):
 
     return submission
 
-def format_submission_for_display(submission, current_user, search_id):
+def get_submissions_stats(submission_ids):
+    """
+	Helper method to count the views and clicks of several submissions (or webpages) at once,
+	with one aggregation per clicks collection instead of counts per submission.
+	Arguments:
+		submission_ids : list : the ObjectIDs of the submissions.
+	Returns:
+		stats : dict : maps each submission id to a dict with "views" and "clicks".
+	"""
+    stats = {submission_id: {"views": 0, "clicks": 0} for submission_id in submission_ids}
+    if not stats:
+        return stats
+
+    cdl_searches_clicks = SearchesClicks()
+    search_counts = cdl_searches_clicks.aggregate([
+        {"$match": {"submission_id": {"$in": submission_ids},
+                    "type": {"$in": ["click_search_result", "submission_view"]}}},
+        {"$group": {"_id": {"submission_id": "$submission_id", "type": "$type"}, "count": {"$sum": 1}}}
+    ])
+    for search_count in search_counts:
+        stat = "clicks" if search_count["_id"]["type"] == "click_search_result" else "views"
+        stats[search_count["_id"]["submission_id"]][stat] += search_count["count"]
+
+    cdl_recommendations_clicks = RecommendationsClicks()
+    rec_counts = cdl_recommendations_clicks.aggregate([
+        {"$match": {"submission_id": {"$in": submission_ids}}},
+        {"$group": {"_id": "$submission_id", "count": {"$sum": 1}}}
+    ])
+    for rec_count in rec_counts:
+        stats[rec_count["_id"]]["clicks"] += rec_count["count"]
+
+    return stats
+
+def format_submission_for_display(submission, current_user, search_id, stats=None, user_communities_info=None):
     """
 	Helper method to format a raw mongodb submission for frontend display.
 	Mostly takes the original format, except removes any unnecessary information.
@@ -1215,6 +1588,8 @@ def format_submission_for_display(submission, current_user, search_id):
 		current_user : the User object of the current user.
 		communities : list : list of communities that the user is a member of
 		search_id : ObjectID : the id of the view submission log (for tracking clicks)
+		stats : dict : the views and clicks of the submission, from get_submissions_stats (fetched if not provided)
+		user_communities_info : dict : the "community_info" of get_communities_helper with return_dict (fetched if not provided)
 	Returns:
 		submission : dict : a slightly-modified submission object.
 	"""
@@ -1224,25 +1599,17 @@ def format_submission_for_display(submission, current_user, search_id):
 
     user_id = current_user.id
 
+    if stats is None:
+        stats = get_submissions_stats([submission["_id"]])[submission["_id"]]
+
     submission["stats"] = {
-        "views": 0,
-        "clicks": 0,
+        "views": stats["views"],
+        "clicks": stats["clicks"],
         "shares": 0
     }
     num_shares = sum([len(submission["communities"][str(id)]) for id in submission["communities"]])
     submission["stats"]["shares"] = num_shares
 
-    cdl_searches_clicks = SearchesClicks()
-    num__search_clicks = cdl_searches_clicks.count({"submission_id": submission["_id"], "type": "click_search_result"})
-    submission["stats"]["clicks"] = num__search_clicks
-
-    cdl_recommendations_clicks = RecommendationsClicks()
-    num_rec_clicks = cdl_recommendations_clicks.count({"submission_id": submission["_id"]})
-    submission["stats"]["clicks"] += num_rec_clicks
-
-    num_views = cdl_searches_clicks.count({"submission_id": submission["_id"], "type": "submission_view"})
-    submission["stats"]["views"] = num_views
-
     # for deleting the entire submission
     if submission["user_id"] == user_id:
         submission["can_delete"] = True
@@ -1257,9 +1624,10 @@ def format_submission_for_display(submission, current_user, search_id):
                              submission["communities"][all_user]}
 
     # need to reconstruct user , but username does not matter
-    hydrated_user_communities = \
-        get_communities_helper(current_user, return_dict=True)[
-            "community_info"]
+    if user_communities_info is None:
+        user_communities_info = get_communities_helper(current_user, return_dict=True)["community_info"]
+    # copied, since it is modified for this submission
+    hydrated_user_communities = {community_id: dict(community) for community_id, community in user_communities_info.items()}
 
     for community_id in hydrated_user_communities:
         if community_id in user_contributed_communities:
@@ -1311,7 +1679,7 @@ def format_submission_for_display(submission, current_user, search_id):
 
     return submission
 
-def find_connections(submission_id, user_communities, current_user, search_id):
+def get_accessible_connections(submission_id, user_communities):
     """
 	Helper method for getting the connections given a submission from mongodb.
 	A bit of work because we need to make sure that we only return connections that are
@@ -1319,36 +1687,59 @@ def find_connections(submission_id, user_communities, current_user, search_id):
 	Arguments:
 		submission_id : ObjectID : the ObjectID of the source submission.
 		user_communities : list : a list of ObjectIDs, ids of communities accessible by user.
-		current_user : the User object of the current user
-		search_id : ObjectID : the id of the view submission log (for tracking clicks).
 
 	Returns:
-		filtered_connections : list : a list of submissions formatted according to format_submission_for_display
-			each submission also contains a "connection_description" field
+		accessible_connections : list : (connection, target submission) tuples of the connections visible to the user.
 	"""
 
     cdl_connections = Connections()
+    cdl_logs = Logs()
     all_connections = cdl_connections.find({"source_id": submission_id})
-    filtered_connections = []
+
+    # get all (non-deleted) targets at once
+    target_ids = [connection.target_id for connection in all_connections]
+    all_targets = {target.id: target for target in
+                   cdl_logs.find({"_id": {"$in": target_ids}, "deleted": {"$ne": True}},
+                                 projection=SUBMISSION_DISPLAY_FIELDS)} if target_ids else {}
+
+    user_communities_set = {str(community) for community in user_communities}
+
+    accessible_connections = []
     for connection in all_connections:
-        cdl_logs = Logs()
-        # todo: check this
-        target_connection = cdl_logs.find_one({"_id": connection.target_id})
+        target_connection = all_targets.get(connection.target_id)
 
-        if not target_connection or target_connection.deleted == True:
+        if not target_connection:
             continue
-        connection_communities = {}
 
         # gets all communities that a submission is a part of
-        for uid in target_connection.communities:
-            for community in target_connection.communities[uid]:
-                connection_communities[str(community)] = True
-        # checks user's communities and only adds connection if user is in connection's community
-        for community in user_communities:
-            community = str(community)
-            if community in connection_communities:
-                formatted_connection = format_submission_for_display(target_connection, current_user, search_id)
-                formatted_connection["connection_description"] = connection.description
-                filtered_connections.append(formatted_connection)
-                break
+        connection_communities = {str(community) for uid in target_connection.communities
+                                  for community in target_connection.communities[uid]}
+        # only adds connection if user is in connection's community
+        if not user_communities_set.isdisjoint(connection_communities):
+            accessible_connections.append((connection, target_connection))
+
+    return accessible_connections
+
+def find_connections(accessible_connections, current_user, search_id, all_stats, user_communities_info):
+    """
+	Helper method for formatting the connections of a submission for display.
+	Arguments:
+		accessible_connections : list : the output of get_accessible_connections.
+		current_user : the User object of the current user
+		search_id : ObjectID : the id of the view submission log (for tracking clicks).
+		all_stats : dict : the output of get_submissions_stats, covering every connection target.
+		user_communities_info : dict : the "community_info" of get_communities_helper with return_dict.
+
+	Returns:
+		filtered_connections : list : a list of submissions formatted according to format_submission_for_display
+			each submission also contains a "connection_description" field
+	"""
+
+    filtered_connections = []
+    for connection, target_connection in accessible_connections:
+        formatted_connection = format_submission_for_display(target_connection, current_user, search_id,
+                                                             stats=all_stats[target_connection.id],
+                                                             user_communities_info=user_communities_info)
+        formatted_connection["connection_description"] = connection.description
+        filtered_connections.append(formatted_connection)
     return filtered_connections
\ No newline at end of file
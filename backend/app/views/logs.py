@@ -75,7 +75,7 @@ def log_submission(ip, user_id, highlighted_text, source_url, explanation, commu
 	return inserted_status, log
 
 
-def log_search(ip, user_id, source, query, communities, own_submissions, highlighted_text="", url=""):
+def log_search(ip, user_id, source, query, communities, own_submissions, highlighted_text="", url="", community_names=None):
 	"""
 	Logs when a user performs a search on the search engine website.
 	Arguments:
@@ -84,6 +84,7 @@ def log_search(ip, user_id, source, query, communities, own_submissions, highlig
 		source : (string) : either "webpage_search", "extension_search", or "extension_open"
 		query : (string) : the raw query entered by the user.
 		communities : (list) : the community scope of the user search.
+		community_names : (dict) : the names of the communities by ID, stored so that paging does not need to look them up.
 	Returns:
 		search_id : (string) : the search ID of the query.
 		insert.acknowledged : (boolean) : indicates if the log was successful.
@@ -100,6 +101,9 @@ def log_search(ip, user_id, source, query, communities, own_submissions, highlig
 		"time": time.time()
 	}
 
+	if community_names is not None:
+		log["community_names"] = community_names
+
 	if source == "extension_open" or source == "extension_search":
 		log["highlighted_text"] = highlighted_text
 		log["url"] = url
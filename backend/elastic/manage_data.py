@@ -72,7 +72,7 @@ class ElasticManager:
         query_obj["query"] = new_query
         return query_obj
 
-    def get_community(self, community, page=0, page_size=10):
+    def get_community(self, community, page=0, page_size=10, search_after=None, total_hits=True):
         """
         Get the community submissions.
 
@@ -80,6 +80,8 @@ class ElasticManager:
             community : (string) : the community ID.
             page : (int) : the page number to return (default 0).
             page_size : (int) : the number of results per page (default 10).
+            search_after : (list) : the sort values of the last hit of the previous page, to page without from (default None).
+            total_hits : (bool) : to count the total hits or not, e.g., when it is already known from the first page (default True).
         
         Returns:
             The JSON hits for the community.
@@ -94,12 +96,17 @@ class ElasticManager:
                 }
             }
         }
+        if search_after:
+            del query["from"]
+            query["search_after"] = search_after
+        if not total_hits:
+            query["track_total_hits"] = False
 
         r = requests.get(self.domain + self.index_name + "/_search", json=query, auth=self.auth)
         hits_total_value, hits = self.postprocess(r.text)
         return hits_total_value, hits
 
-    def get_submissions(self, user_id, page=0, page_size=10):
+    def get_submissions(self, user_id, page=0, page_size=10, search_after=None, total_hits=True):
         """
         Get the community submissions.
 
@@ -107,6 +114,8 @@ class ElasticManager:
             user_id : (string) : the user_id.
             page : (int) : the page number to return (default 0).
             page_size : (int) : the number of results per page (default 10).
+            search_after : (list) : the sort values of the last hit of the previous page, to page without from (default None).
+            total_hits : (bool) : to count the total hits or not, e.g., when it is already known from the first page (default True).
         
         Returns:
             The JSON hits for the community.
@@ -121,12 +130,17 @@ class ElasticManager:
                 }
             }
         }
+        if search_after:
+            del query["from"]
+            query["search_after"] = search_after
+        if not total_hits:
+            query["track_total_hits"] = False
 
         r = requests.get(self.domain + self.index_name + "/_search", json=query, auth=self.auth)
         hits_total_value, hits = self.postprocess(r.text)
         return hits_total_value, hits
 
-    def search(self, query, communities, page=0, page_size=10):
+    def search(self, query, communities, page=0, page_size=10, preference=None):
         """
         The method for searching a query over all of the saved webpage submissions.
 
@@ -135,9 +149,55 @@ class ElasticManager:
             communities : (list) : the communities to condition the search.
             page : (int) : the page number to return (default 0).
             page_size : (int) : the number of results per page (default 10).
+            preference : (string) : routes searches with the same value to the same shard copies (e.g., the user id), for cache hits and consistent results.
         Returns:
             The JSON hits for the query.
         """
+        query_comm = self.build_search_query(query, communities, page=page, page_size=page_size)
+
+        params = {"preference": preference} if preference else None
+        r = requests.get(self.domain + self.index_name + "/_search", json=query_comm, params=params, auth=self.auth)
+        hits_total_value, hits = self.postprocess(r.text)
+        return hits_total_value, hits
+
+    def multi_search(self, searches, preference=None):
+        """
+        The method for running several searches with a single request (_msearch), e.g., over the submissions and webpages indices.
+
+        Arguments:
+            searches : (list) : (index name, search body) pairs, where the body is from build_search_query.
+            preference : (string) : see search.
+        Returns:
+            A list with the total and JSON hits of each search, in the same order (0 and [] for any failed search).
+        """
+        lines = []
+        for index_name, query_comm in searches:
+            header = {"index": index_name}
+            if preference:
+                header["preference"] = preference
+            lines.append(json.dumps(header))
+            lines.append(json.dumps(query_comm))
+
+        r = self._post_ndjson("_msearch", lines)
+        return self.postprocess_multi(r.text, len(searches))
+
+    def _post_ndjson(self, path, lines):
+        """
+        Posts JSON strings as a newline-delimited JSON body (for _msearch and _bulk), which must end with a newline.
+
+        Arguments:
+            path : (string) : the path after the domain, e.g., "_msearch".
+            lines : (list) : the JSON string of each line.
+        Returns:
+            The requests response.
+        """
+        return requests.post(self.domain + path, data="\n".join(lines) + "\n",
+                             headers={"Content-Type": "application/x-ndjson"}, auth=self.auth)
+
+    def build_search_query(self, query, communities, page=0, page_size=10):
+        """
+        Builds the search body used by search, see search for the arguments.
+        """
 
         query_obj = self.process_query(query)
         print("new query: ", query_obj["query"])
@@ -216,15 +276,14 @@ class ElasticManager:
                 },
             }
 
-        r = requests.get(self.domain + self.index_name + "/_search", json=query_comm, auth=self.auth)
-        hits_total_value, hits = self.postprocess(r.text)
-        return hits_total_value, hits
+        return query_comm
 
 
     def add_to_index(self, doc):
         """
         Method to index a submission in Elastic. Simply saves the raw highlighted text, explanation, and source URL as searchable text.
         Also saves community and user id as communities to match terms.
+        If a document with the same id is already indexed, it is fully replaced.
 
         Arguments: 
             doc : (dictionary) : user submission with highlighted_text, communities, explanation, and source_url.
@@ -232,6 +291,51 @@ class ElasticManager:
         Returns:
             The response string from elastic, and the hashtags, if any
         """
+        doc_id, inserted_doc, hashtags = self.build_index_document(doc)
+
+        r = requests.put(self.domain + self.index_name + "/_doc/" + doc_id, json=inserted_doc, auth=self.auth)
+        return r.text, hashtags
+
+    def bulk_add_to_index(self, docs):
+        """
+        Method to index several submissions (or webpages) with a single Elastic bulk request, see add_to_index.
+
+        Arguments:
+            docs : (list) : the documents to index.
+
+        Returns:
+            A list with whether each document was indexed, in the same order as docs.
+        """
+        lines = []
+        for doc in docs:
+            doc_id, inserted_doc, _ = self.build_index_document(doc)
+            lines.append(json.dumps({"index": {"_id": doc_id}}))
+            lines.append(json.dumps(inserted_doc))
+
+        r = self._post_ndjson(self.index_name + "/_bulk", lines)
+        try:
+            resp = json.loads(r.text)
+            indexed = [200 <= item["index"]["status"] < 300 for item in resp["items"]]
+        except Exception as e:
+            print(e)
+            traceback.print_exc()
+            print(r.text)
+            return [False] * len(docs)
+
+        if resp.get("errors"):
+            print("Bulk indexing errors: ", [item["index"].get("error") for item in resp["items"] if "error" in item["index"]])
+        return indexed
+
+    def build_index_document(self, doc):
+        """
+        Method to build the document saved in Elastic for a submission or webpage (no requests are made).
+
+        Arguments:
+            doc : (dictionary) : user submission or webpage, see add_to_index.
+
+        Returns:
+            The id of the document, the document to index, and the hashtags, if any
+        """
 
         if self.index_name == os.environ["elastic_index_name"]:
             highlighted_text = doc.highlighted_text
@@ -282,8 +386,7 @@ class ElasticManager:
             }
             hashtags = []
 
-        r = requests.put(self.domain + self.index_name + "/_doc/" + doc_id, json=inserted_doc, auth=self.auth)
-        return r.text, hashtags
+        return doc_id, inserted_doc, hashtags
 
     def backfill(self):
         """
@@ -383,14 +486,41 @@ class ElasticManager:
         return flat_communities
 
 
-    def postprocess(self, text):
-
+    def fix_encoding(self, text):
         try:
             text = text.encode("latin1", errors="strict").decode("utf8", errors="strict")
         except Exception as e:
             print(e)
             traceback.print_exc()
             text = text.encode("utf8", errors="ignore").decode("utf8", errors="ignore")
+        return text
+
+    def postprocess_multi(self, text, num_searches):
+        text = self.fix_encoding(text)
+
+        results = []
+        try:
+            responses = json.loads(text)["responses"]
+        except Exception as e:
+            print(e)
+            traceback.print_exc()
+            print(text)
+            return [(0, [])] * num_searches
+
+        for resp in responses:
+            try:
+                hits = resp["hits"]
+                print("\tTook: ", resp["took"])
+                results.append((hits["total"]["value"], hits["hits"]))
+            except Exception as e:
+                print(e)
+                print(resp)
+                results.append((0, []))
+        return results
+
+    def postprocess(self, text):
+
+        text = self.fix_encoding(text)
         
         try:
             hits = json.loads(text)["hits"]
@@ -403,4 +533,5 @@ class ElasticManager:
             print(text)
             return 0, []
 
-        return hits["total"]["value"], hits["hits"]
\ No newline at end of file
+        # total is left out when track_total_hits is false
+        return hits.get("total", {}).get("value", 0), hits["hits"]
\ No newline at end of file
@@ -9,7 +9,7 @@ from app.views.communities import communities
 from app.views.notes import notes
 from app.views.functional import functional
 from app.views.logs import *
-from app.db import get_db, get_redis
+from app.db import get_db, get_redis, create_indexes
 
 app = Flask(__name__)
 CORS(app)
@@ -38,6 +38,7 @@ app.config['SECRET_KEY'] = os.environ["jwt_secret"]
 with app.app_context():
 	get_db()
 	get_redis()
+	create_indexes()
 
 # for nltk data, used for parsing queries
 nltk.download("brown")
@@ -314,6 +314,21 @@ def test_recommendation(data):
     resp = requests.post(url, headers=headers, data=payload)
     assert resp.status_code == 200
 
+    # submitted webpages are scraped and indexed in the background, so wait until the webpage can be searched
+    # (fresh searches are not cached, unlike explore recommendations)
+    search_params = {
+        "community": "all",
+        "query": "Wikimedia technical groups"
+    }
+    deadline = time.time() + 30
+    while True:
+        resp = requests.request("GET", URL + "/api/search", params=search_params, headers={'Authorization': data.token})
+        assert resp.status_code == 200
+        if any("Indexed" in x.get("time", "") for x in resp.json()["search_results_page"]):
+            break
+        assert time.time() < deadline, "webpage was not indexed in time"
+        time.sleep(0.5)
+
     # Use the primary user token to search for recommendation
     url = URL + "/api/recommend"
     headers = {
@@ -395,8 +410,33 @@ def test_submission_batch(data):
     assert resp.status_code == 200
     resp_body  = resp.json()
 
-    assert resp_body["Submission 0"]['message'] ==  "Context successfully submitted and indexed."
-    assert resp_body["Submission 1"]['message'] ==  "Context successfully submitted and indexed."
+    assert resp_body["results"][0]['message'] ==  "Context successfully submitted and indexed."
+    assert resp_body["results"][1]['message'] ==  "Context successfully submitted and indexed."
+
+
+def test_submission_scrape_url_variants(data):
+    # the same page with different fragments (e.g., extension highlights) is only scraped and inserted once
+    url = URL + "/api/submission/"
+    headers = {
+        'authorization': data.token
+    }
+    for fragment in ["#History", "#:~:text=digital%20library"]:
+        payload = {
+            "highlighted_text": "digital library history",
+            "source_url": "https://en.wikipedia.org/wiki/Digital_library" + fragment,
+            "explanation": "digital library article",
+            "community": data.communityId
+        }
+        resp = requests.post(url, headers=headers, data=payload)
+        assert resp.status_code == 200
+
+    # webpages are scraped in the background
+    webpage_query = {"url": "https://en.wikipedia.org/wiki/Digital_library"}
+    deadline = time.time() + 30
+    while data.cdl_db.webpages.count_documents(webpage_query) == 0:
+        assert time.time() < deadline, "webpage was not scraped in time"
+        time.sleep(0.5)
+    assert data.cdl_db.webpages.count_documents(webpage_query) == 1
 
 
 def test_connection_invalid_source(data):
@@ -263,7 +263,16 @@ function Header(props) {
       } else {
         setSubmitBatchStatus("error");
         setSubmitBatchMessage("Issues found with some submissions.");
-        setFoundIssues(JSON.stringify(resJson.message));
+        // results of the failed submissions (by position in the batch), or the error message if the batch could not be processed
+        if (resJson.errors) {
+          setFoundIssues(
+            JSON.stringify(
+              resJson.errors.map((i) => ({ submission: i, ...resJson.results[i] }))
+            )
+          );
+        } else {
+          setFoundIssues(JSON.stringify(resJson.message));
+        }
         setSubmitBatch(true); // Show third Alert message
         setSubmitErrors(true); // Show the button to copy error log
         setShowProgress(false);
@@ -53,6 +53,8 @@ function SearchResults({ data, show_relevance_judgment, own_submissions, communi
       });
       const content = await response.json();
       setItems([...items, ...content.search_results_page]);
+      // ranked searches only report the results fetched so far (plus a page if there are more), so this can grow
+      setTotalPages(Math.ceil(content.total_num_results / 10));
 
       if ((page + 1) % 5 === 0) {
         setLoading(true);
@@ -60,7 +62,7 @@ function SearchResults({ data, show_relevance_judgment, own_submissions, communi
         setLoading(false);
       }
 
-      if (page !== totalPages) {
+      if (page !== Math.ceil(content.total_num_results / 10)) {
         setPage(page + 1);
       }
 
@@ -154,7 +156,7 @@ function SearchResults({ data, show_relevance_judgment, own_submissions, communi
             {data.query == "" ? (
               <h6>Search Results (Total: {data.total_num_results})</h6>
             ) : (
-              <h6>Search Results for "{data.query}" in {searchedCommunity} (Total: {data.total_num_results})</h6>
+              <h6>Search Results for "{data.query}" in {searchedCommunity}</h6>
             )}
           </Grid>
         )}